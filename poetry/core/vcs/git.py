@@ -1,95 +1,192 @@
+import os
 import re
+import string
 import subprocess
+import threading
 
 from collections import namedtuple
 from pathlib import Path
 from typing import Any
+from typing import Dict
+from typing import List
 from typing import Optional
+from typing import Pattern
+from typing import Set
 
 
+# Url schemes and ports are ASCII only, paths and names are not restricted to
+# it however since local repositories can live in non-ASCII directories.
 pattern_formats = {
-    "protocol": r"\w+",
+    "protocol": r"[a-zA-Z0-9_]+",
     "user": r"[a-zA-Z0-9_.-]+",
     "resource": r"[a-zA-Z0-9_.-]+",
-    "port": r"\d+",
+    "resource_char": r"[a-zA-Z0-9_.-]",
+    "port": r"[0-9]+",
+    "port_char": r"[0-9]",
     "path": r"[\w~.\-/\\]+",
     "name": r"[\w~.\-]+",
+    "name_char": r"[\w~.\-]",
     "rev": r"[^@#]+",
 }
 
-PATTERNS = [
-    re.compile(
-        r"^(git\+)?"
-        r"(?P<protocol>https?|git|ssh|rsync|file)://"
-        r"(?:(?P<user>{user})@)?"
-        r"(?P<resource>{resource})?"
-        r"(:(?P<port>{port}))?"
-        r"(?P<pathname>[:/\\]({path}[/\\])?"
-        r"((?P<name>{name}?)(\.git|[/\\])?)?)"
-        r"([@#](?P<rev>{rev}))?"
-        r"$".format(
-            user=pattern_formats["user"],
-            resource=pattern_formats["resource"],
-            port=pattern_formats["port"],
-            path=pattern_formats["path"],
-            name=pattern_formats["name"],
-            rev=pattern_formats["rev"],
-        )
-    ),
-    re.compile(
-        r"(git\+)?"
-        r"((?P<protocol>{protocol})://)"
-        r"(?:(?P<user>{user})@)?"
-        r"(?P<resource>{resource}:?)"
-        r"(:(?P<port>{port}))?"
-        r"(?P<pathname>({path})"
-        r"(?P<name>{name})(\.git|/)?)"
-        r"([@#](?P<rev>{rev}))?"
-        r"$".format(
-            protocol=pattern_formats["protocol"],
-            user=pattern_formats["user"],
-            resource=pattern_formats["resource"],
-            port=pattern_formats["port"],
-            path=pattern_formats["path"],
-            name=pattern_formats["name"],
-            rev=pattern_formats["rev"],
-        )
-    ),
-    re.compile(
-        r"^(?:(?P<user>{user})@)?"
-        r"(?P<resource>{resource})"
-        r"(:(?P<port>{port}))?"
-        r"(?P<pathname>([:/]{path}/)"
-        r"(?P<name>{name})(\.git|/)?)"
-        r"([@#](?P<rev>{rev}))?"
-        r"$".format(
-            user=pattern_formats["user"],
-            resource=pattern_formats["resource"],
-            port=pattern_formats["port"],
-            path=pattern_formats["path"],
-            name=pattern_formats["name"],
-            rev=pattern_formats["rev"],
-        )
-    ),
-    re.compile(
-        r"((?P<user>{user})@)?"
-        r"(?P<resource>{resource})"
-        r"[:/]{{1,2}}"
-        r"(?P<pathname>({path})"
-        r"(?P<name>{name})(\.git|/)?)"
-        r"([@#](?P<rev>{rev}))?"
-        r"$".format(
-            user=pattern_formats["user"],
-            resource=pattern_formats["resource"],
-            path=pattern_formats["path"],
-            name=pattern_formats["name"],
-            rev=pattern_formats["rev"],
-        )
-    ),
-]
+# In the patterns below where a {path} is directly followed by a {name}, the
+# overlapping character classes make a failed match backtrack over every
+# possible split between the two, which is quadratic in the length of the url.
+# This lookahead checks, in linear time, that the remainder of the url has the
+# expected shape before the pathname is matched so that a near miss is
+# rejected straight away.
+#
+# The lookahead only helps if it is not tried again at every position the
+# preceding {resource} and {port} could backtrack to since their characters
+# are valid {path} characters as well. In the second pattern, they are thus
+# first matched atomically, by capturing them in a lookahead and consuming
+# that capture through a backreference which the re module does not backtrack
+# into. Since the character following a resource (or a port) is never one of
+# its characters, giving its characters back to the pathname can only change
+# the outcome for the last two of them, so the alternative doing so is bounded
+# accordingly.
+_PATHNAME_LOOKAHEAD = r"(?={path}{name_char}(?:\.git|/)?(?:[@#]{rev})?$)"
+
+_PATTERN_TEMPLATES = (
+    r"^(git\+)?"
+    r"(?P<protocol>https?|git|ssh|rsync|file)://"
+    r"(?:(?P<user>{user})@)?"
+    r"(?P<resource>{resource})?"
+    r"(:(?P<port>{port}))?"
+    r"(?P<pathname>[:/\\]({path}[/\\])?"
+    r"((?P<name>{name}?)(\.git|[/\\])?)?)"
+    r"([@#](?P<rev>{rev}))?"
+    r"$",
+    r"(git\+)?"
+    r"((?P<protocol>{protocol})://)"
+    r"(?:(?P<user>{user})@)?"
+    r"(?P<resource>(?=(?P<resource_chars>{resource}))(?P=resource_chars):?"
+    r"|{resource}(?={resource_char}{{1,2}}(?!{resource_char})))"
+    r"(:(?P<port>(?=(?P<port_chars>{port}))(?P=port_chars)"
+    r"|{port}(?={port_char}{{1,2}}(?!{port_char}))))?"
+    r"{pathname_lookahead}"
+    r"(?P<pathname>({path})"
+    r"(?P<name>{name})(\.git|/)?)"
+    r"([@#](?P<rev>{rev}))?"
+    r"$",
+    r"^(?:(?P<user>{user})@)?"
+    r"(?P<resource>{resource})"
+    r"(:(?P<port>{port}))?"
+    r"(?P<pathname>([:/]{path}/)"
+    r"(?P<name>{name})(\.git|/)?)"
+    r"([@#](?P<rev>{rev}))?"
+    r"$",
+    r"((?P<user>{user})@)?"
+    r"(?P<resource>{resource})"
+    r"[:/]{{1,2}}"
+    r"{pathname_lookahead}"
+    r"(?P<pathname>({path})"
+    r"(?P<name>{name})(\.git|/)?)"
+    r"([@#](?P<rev>{rev}))?"
+    r"$",
+)
+
+_PATTERN: Optional[Pattern] = None
+
+
+def _pattern() -> Pattern:
+    # The templates are merged into a single alternation, compiled on first
+    # use rather than at import time since most consumers of poetry-core
+    # never parse a git url. Each branch is wrapped in a group named "_<n>"
+    # and its own groups, and the backreferences to them, are suffixed
+    # accordingly so that the matching branch can be identified through
+    # Match.lastgroup.
+    global _PATTERN
+
+    if _PATTERN is None:
+        branches = []
+        for i, template in enumerate(_PATTERN_TEMPLATES, 1):
+            branch = re.sub(
+                r"\(\?P([<=])(\w+)",
+                r"(?P\1\2_{}".format(i),
+                template.format(
+                    pathname_lookahead=_PATHNAME_LOOKAHEAD.format(**pattern_formats),
+                    **pattern_formats,
+                ),
+            )
+            branches.append("(?P<_{}>{})".format(i, branch))
+
+        _PATTERN = re.compile("|".join(branches))
+
+    return _PATTERN
+
+
+_RE_GIT_PLUS = re.compile(r"^git\+")
+_RE_GIT_PLUS_HTTPS = re.compile(r"^git\+https?")
+_RE_COLON_PATH = re.compile(r"^/?:[^0-9]")
+_RE_GIT_COLON = re.compile(r"git\+(.*:[^:]+):(.*)")
+_RE_GIT_PLUS_FILE = re.compile(r"^git\+file")
+_RE_SSH_PREFIX = re.compile(r"^(?:git\+)?ssh://")
+_RE_TRAILING_FRAG = re.compile(r"#[^#]*$")
+
+_FAST_PARSE_PROTOCOLS = {"http", "https", "git", "ssh", "rsync", "file"}
+_FAST_PARSE_RESOURCE_CHARS = string.ascii_letters + string.digits + "_.-"
+_FAST_PARSE_PATH_CHARS = string.ascii_letters + string.digits + "_~./-"
+
+
+def _fast_parse(url: str) -> Optional["ParsedUrl"]:
+    """
+    Parse urls of the common "<protocol>://[<user>@]<resource>[:<port>]/<path>"
+    shape, optionally followed by a revision, without running the patterns.
+
+    The result is the same as the one of the first pattern. None is returned
+    for anything that does not fit this shape, the caller then falls back
+    to the patterns.
+    """
+    if url.startswith("git+"):
+        url = url[4:]
+
+    protocol, sep, rest = url.partition("://")
+    if not sep or protocol not in _FAST_PARSE_PROTOCOLS:
+        return None
+
+    authority, sep, path = rest.partition("/")
+    if not sep or path.startswith("/"):
+        return None
+
+    user, sep, resource = authority.rpartition("@")
+    if sep and (not user or user.strip(_FAST_PARSE_RESOURCE_CHARS)):
+        return None
+
+    resource, sep, port = resource.partition(":")
+    if sep and (not port or port.strip(string.digits)):
+        return None
+
+    if resource.strip(_FAST_PARSE_RESOURCE_CHARS):
+        return None
+
+    rev = None
+    remainder = path.lstrip(_FAST_PARSE_PATH_CHARS)
+    if remainder:
+        rev = remainder[1:]
+        if remainder[0] not in "@#" or not rev or "@" in rev or "#" in rev:
+            return None
+
+        path = path[: -len(remainder)]
+
+    name = path.rpartition("/")[2]
+    if len(name) > 4 and name.endswith(".git"):
+        name = name[:-4]
+
+    return ParsedUrl(
+        protocol,
+        resource or None,
+        "/" + path,
+        user or None,
+        port or None,
+        name or None,
+        rev,
+    )
 
 
 class ParsedUrl:
+    __slots__ = ("protocol", "resource", "pathname", "user", "port", "name", "rev")
+
     def __init__(
         self,
         protocol: Optional[str],
@@ -110,31 +207,46 @@ class ParsedUrl:
 
     @classmethod
     def parse(cls, url: str) -> "ParsedUrl":
-        for pattern in PATTERNS:
-            m = pattern.match(url)
-            if m:
-                groups = m.groupdict()
-                return ParsedUrl(
-                    groups.get("protocol"),
-                    groups.get("resource"),
-                    groups.get("pathname"),
-                    groups.get("user"),
-                    groups.get("port"),
-                    groups.get("name"),
-                    groups.get("rev"),
-                )
+        parsed = _fast_parse(url)
+        if parsed is not None:
+            return parsed
+
+        # Every supported url shape has a ":" or a "/" before its pathname,
+        # anything else can be rejected without running the pattern.
+        m = (":" in url or "/" in url) and _pattern().match(url)
+        if m:
+            suffix = m.lastgroup
+            groups = m.groupdict()
+            return ParsedUrl(
+                groups.get("protocol" + suffix),
+                groups.get("resource" + suffix),
+                groups.get("pathname" + suffix),
+                groups.get("user" + suffix),
+                groups.get("port" + suffix),
+                groups.get("name" + suffix),
+                groups.get("rev" + suffix),
+            )
 
         raise ValueError('Invalid git url "{}"'.format(url))
 
     @property
     def url(self) -> str:
-        return "{}{}{}{}{}".format(
-            "{}://".format(self.protocol) if self.protocol else "",
-            "{}@".format(self.user) if self.user else "",
-            self.resource,
-            ":{}".format(self.port) if self.port else "",
-            "/" + self.pathname.lstrip(":/"),
-        )
+        parts = []
+        if self.protocol:
+            parts.append("{}://".format(self.protocol))
+
+        if self.user:
+            parts.append("{}@".format(self.user))
+
+        if self.resource:
+            parts.append(self.resource)
+
+        if self.port:
+            parts.append(":{}".format(self.port))
+
+        parts.append("/" + self.pathname.lstrip(":/"))
+
+        return "".join(parts)
 
     def format(self) -> str:
         return self.url
@@ -145,23 +257,51 @@ class ParsedUrl:
 
 GitUrl = namedtuple("GitUrl", ["url", "revision"])
 
+# Configurations read by GitConfig.instance(), keyed on the working directory
+# they were read from since "git config -l" includes the local configuration
+# of the repository containing it.
+_GIT_CONFIGS: Dict[str, "GitConfig"] = {}
+
 
 class GitConfig:
-    def __init__(self, requires_git_presence: bool = False) -> None:
-        self._config = {}
+    def __init__(
+        self,
+        requires_git_presence: bool = False,
+        config: Optional[Dict[str, str]] = None,
+    ) -> None:
+        if config is None:
+            try:
+                config = self._read()
+            except (subprocess.CalledProcessError, OSError):
+                if requires_git_presence:
+                    raise
 
-        try:
-            config_list = subprocess.check_output(
-                ["git", "config", "-l"], stderr=subprocess.STDOUT
-            ).decode()
-
-            m = re.findall("(?ms)^([^=]+)=(.*?)$", config_list)
-            if m:
-                for group in m:
-                    self._config[group[0]] = group[1]
-        except (subprocess.CalledProcessError, OSError):
-            if requires_git_presence:
-                raise
+                config = {}
+
+        self._config = config
+
+    @classmethod
+    def instance(cls, requires_git_presence: bool = False) -> "GitConfig":
+        cwd = os.getcwd()
+        config = _GIT_CONFIGS.get(cwd)
+        if config is None:
+            try:
+                values = cls._read()
+            except (subprocess.CalledProcessError, OSError):
+                if requires_git_presence:
+                    raise
+
+                # The empty configuration is not cached so that a later call
+                # requiring git still fails if it is unavailable.
+                return cls(config={})
+
+            config = _GIT_CONFIGS[cwd] = cls(config=values)
+
+        return config
+
+    @classmethod
+    def invalidate(cls) -> None:
+        _GIT_CONFIGS.clear()
 
     def get(self, key: Any, default: Optional[Any] = None) -> Any:
         return self._config.get(key, default)
@@ -169,41 +309,122 @@ class GitConfig:
     def __getitem__(self, item: Any) -> Any:
         return self._config[item]
 
+    @staticmethod
+    def _read() -> Dict[str, str]:
+        config_list = subprocess.check_output(
+            ["git", "config", "-l"], stderr=subprocess.STDOUT
+        ).decode()
+
+        config = {}
+        for line in config_list.splitlines():
+            key, sep, value = line.partition("=")
+            if sep:
+                config[key] = value
+
+        return config
+
+
+class _GitBatch:
+    """
+    A long-running "git cat-file --batch-check" process resolving revisions
+    to object names without spawning a git process for each lookup.
+
+    Lookups are serialized so that the same batch can be shared by threads.
+    """
+
+    def __init__(self, args: List[str]) -> None:
+        self._cmd = ["git"] + args + ["cat-file", "--batch-check=%(objectname)"]
+        self._lock = threading.Lock()
+        self._exited = False
+        self._process = subprocess.Popen(
+            self._cmd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+
+    @property
+    def alive(self) -> bool:
+        return not self._exited and self._process.poll() is None
+
+    def resolve(self, rev: str) -> str:
+        with self._lock:
+            try:
+                self._process.stdin.write(rev.encode() + b"\n")
+                self._process.stdin.flush()
+                line = self._process.stdout.readline().decode().rstrip("\n")
+            except OSError:
+                line = ""
+
+            if not line:
+                self._exited = True
+
+        # Unknown and ambiguous revisions are reported on stdout as
+        # "<rev> missing" and "<rev> ambiguous" respectively, while an empty
+        # line means that git exited, e.g. because the folder is not a
+        # repository.
+        if not line or line.endswith((" missing", " ambiguous")):
+            raise subprocess.CalledProcessError(
+                self._process.poll() or 128, self._cmd, output=line.encode()
+            )
+
+        return line
+
+    def close(self) -> None:
+        try:
+            self._process.stdin.close()
+        except OSError:
+            pass
+
+        self._process.wait()
+        self._process.stdout.close()
+
 
 class Git:
     def __init__(self, work_dir: Optional[Path] = None) -> None:
-        self._config = GitConfig(requires_git_presence=True)
+        self._batches: Dict[Path, _GitBatch] = {}
+        self._unbatched: Set[Path] = set()
+        self._batches_lock = threading.Lock()
+        self._config = GitConfig.instance(requires_git_presence=True)
         self._work_dir = work_dir
 
+    def __del__(self) -> None:
+        self.close()
+
     @classmethod
     def normalize_url(cls, url: str) -> GitUrl:
         parsed = ParsedUrl.parse(url)
 
-        formatted = re.sub(r"^git\+", "", url)
-        if parsed.rev:
-            formatted = re.sub(r"[#@]{}$".format(parsed.rev), "", formatted)
+        formatted = _RE_GIT_PLUS.sub("", url)
+        if (
+            parsed.rev
+            and formatted.endswith(parsed.rev)
+            and formatted[-len(parsed.rev) - 1 : -len(parsed.rev)] in ("#", "@")
+        ):
+            formatted = formatted[: -(len(parsed.rev) + 1)]
 
-        altered = parsed.format() != formatted
+        parsed_formatted = parsed.format()
+        altered = parsed_formatted != formatted
 
         if altered:
-            if re.match(r"^git\+https?", url) and re.match(
-                r"^/?:[^0-9]", parsed.pathname
-            ):
-                normalized = re.sub(r"git\+(.*:[^:]+):(.*)", "\\1/\\2", url)
-            elif re.match(r"^git\+file", url):
-                normalized = re.sub(r"git\+", "", url)
+            if _RE_GIT_PLUS_HTTPS.match(url) and _RE_COLON_PATH.match(parsed.pathname):
+                normalized = _RE_GIT_COLON.sub("\\1/\\2", url)
+            elif _RE_GIT_PLUS_FILE.match(url):
+                normalized = url.replace("git+", "")
             else:
-                normalized = re.sub(r"^(?:git\+)?ssh://", "", url)
+                normalized = _RE_SSH_PREFIX.sub("", url)
         else:
-            normalized = parsed.format()
+            normalized = parsed_formatted
 
-        return GitUrl(re.sub(r"#[^#]*$", "", normalized), parsed.rev)
+        return GitUrl(_RE_TRAILING_FRAG.sub("", normalized), parsed.rev)
 
     @property
     def config(self) -> GitConfig:
         return self._config
 
     def clone(self, repository: str, dest: Path) -> str:
+        self._close_batch(dest)
+
         return self.run("clone", "--recurse-submodules", repository, str(dest))
 
     def checkout(self, rev: str, folder: Optional[Path] = None) -> str:
@@ -211,6 +432,8 @@ class Git:
         if folder is None and self._work_dir:
             folder = self._work_dir
 
+        self._close_batch(folder)
+
         if folder:
             args += [
                 "--git-dir",
@@ -224,18 +447,9 @@ class Git:
         return self.run(*args)
 
     def rev_parse(self, rev: str, folder: Optional[Path] = None) -> str:
-        args = []
         if folder is None and self._work_dir:
             folder = self._work_dir
 
-        if folder:
-            args += [
-                "--git-dir",
-                (folder / ".git").as_posix(),
-                "--work-tree",
-                folder.as_posix(),
-            ]
-
         # We need "^0" (an alternative to "^{commit}") to ensure that the
         # commit SHA of the commit the tag points to is returned, even in
         # the case of annotated tags.
@@ -244,9 +458,35 @@ class Git:
         # platforms (cygwin/msys to be specific), the braces are interpreted
         # as special characters and would require escaping, while on others
         # they should not be escaped.
-        args += ["rev-parse", rev + "^0"]
+        rev += "^0"
 
-        return self.run(*args)
+        # The batch process reads one revision per line and keeps resolving
+        # them against the directory it was started in, so it is only used
+        # for an explicit folder, not for the current working directory.
+        if folder is None or "\n" in rev:
+            return self.run("rev-parse", rev, folder=folder)
+
+        # The batch process is keyed on the absolute folder so that a relative
+        # one still refers to the same repository after a change of directory.
+        folder = Path(os.path.abspath(folder))
+        if folder in self._unbatched:
+            return self.run("rev-parse", rev, folder=folder)
+
+        batch = self._batch(folder)
+        try:
+            return batch.resolve(rev)
+        except subprocess.CalledProcessError:
+            if not batch.alive:
+                # git exited, most likely because the folder is not a
+                # repository, so do not start a new batch process for each
+                # lookup until the folder is changed by clone() or checkout().
+                self._close_batch(folder)
+                with self._batches_lock:
+                    self._unbatched.add(folder)
+
+            # The batch process does not tell why a revision could not be
+            # resolved, let git rev-parse report it.
+            return self.run("rev-parse", rev, folder=folder)
 
     def get_ignored_files(self, folder: Optional[Path] = None) -> list:
         args = []
@@ -264,24 +504,37 @@ class Git:
         args += ["ls-files", "--others", "-i", "--exclude-standard"]
         output = self.run(*args)
 
-        return output.strip().split("\n")
+        return output.splitlines()
 
     def remote_urls(self, folder: Optional[Path] = None) -> dict:
+        # With -z, each entry is output as "<name>\n<value>\0" which, unlike the
+        # default "<name> <value>\n" format, is not ambiguous when the value
+        # contains spaces.
         output = self.run(
-            "config", "--get-regexp", r"remote\..*\.url", folder=folder
-        ).strip()
+            "config", "-z", "--get-regexp", r"remote\..*\.url", folder=folder
+        )
 
         urls = {}
-        for url in output.splitlines():
-            name, url = url.split(" ", 1)
-            urls[name.strip()] = url.strip()
+        for entry in output.split("\0"):
+            if not entry:
+                continue
+
+            name, _, url = entry.partition("\n")
+            urls[name] = url
 
         return urls
 
     def remote_url(self, folder: Optional[Path] = None) -> str:
         urls = self.remote_urls(folder=folder)
 
-        return urls.get("remote.origin.url", urls[list(urls.keys())[0]])
+        if "remote.origin.url" in urls:
+            return urls["remote.origin.url"]
+
+        return list(urls.values())[0]
+
+    def close(self) -> None:
+        for folder in list(self._batches):
+            self._close_batch(folder)
 
     def run(self, *args: Any, **kwargs: Any) -> str:
         folder = kwargs.pop("folder", None)
@@ -293,8 +546,40 @@ class Git:
                 folder.as_posix(),
             ) + args
 
-        return (
-            subprocess.check_output(["git"] + list(args), stderr=subprocess.STDOUT)
-            .decode()
-            .strip()
-        )
+        return subprocess.check_output(
+            ["git"] + list(args),
+            stderr=subprocess.STDOUT,
+            encoding="utf-8",
+            errors="replace",
+        ).rstrip("\n")
+
+    def _batch(self, folder: Path) -> _GitBatch:
+        with self._batches_lock:
+            batch = self._batches.get(folder)
+            if batch is None or not batch.alive:
+                if batch is not None:
+                    batch.close()
+
+                batch = self._batches[folder] = _GitBatch(
+                    [
+                        "--git-dir",
+                        (folder / ".git").as_posix(),
+                        "--work-tree",
+                        folder.as_posix(),
+                    ]
+                )
+
+        return batch
+
+    def _close_batch(self, folder: Optional[Path]) -> None:
+        # Mutating commands invalidate what a running batch process may have
+        # read from the repository so it is restarted on the next lookup.
+        if folder is not None:
+            folder = Path(os.path.abspath(folder))
+
+        with self._batches_lock:
+            self._unbatched.discard(folder)
+            batch = self._batches.pop(folder, None)
+
+        if batch is not None:
+            batch.close()
@@ -1,8 +1,15 @@
+import subprocess
+
+from pathlib import Path
+
 import pytest
 
 from poetry.core.vcs.git import Git
+from poetry.core.vcs.git import GitConfig
 from poetry.core.vcs.git import GitUrl
 from poetry.core.vcs.git import ParsedUrl
+from poetry.core.vcs.git import _fast_parse
+from poetry.core.vcs.git import _pattern
 
 
 @pytest.mark.parametrize(
@@ -66,6 +73,7 @@ from poetry.core.vcs.git import ParsedUrl
             GitUrl("git@github.com:sdispater/pendulum.git", "foo/bar"),
         ),
         ("git+file:///foo/bar.git", GitUrl("file:///foo/bar.git", None)),
+        ("git+file:///foo/bar.git@v1.0", GitUrl("file:///foo/bar.git", "v1.0")),
         (
             "git+file://C:\\Users\\hello\\testing.git#zkat/windows-files",
             GitUrl("file://C:\\Users\\hello\\testing.git", "zkat/windows-files"),
@@ -219,6 +227,18 @@ def test_normalize_url(url, normalized):
                 "zkat/windows-files",
             ),
         ),
+        (
+            "git+file:///home/jörg/projects/café.git",
+            ParsedUrl(
+                "file",
+                None,
+                "/home/jörg/projects/café.git",
+                None,
+                None,
+                "café",
+                None,
+            ),
+        ),
         (
             "git+https://git.example.com/sdispater/project/my_repo.git",
             ParsedUrl(
@@ -257,8 +277,272 @@ def test_parse_url(url, parsed):
     assert parsed.user == result.user
 
 
-def test_parse_url_should_fail():
-    url = "https://" + "@" * 64 + "!"
-
+@pytest.mark.parametrize(
+    "url",
+    [
+        "https://" + "@" * 64 + "!",
+        "https://hostname/" + "a." * 2048 + "!",
+        "hostname" + "@" * 64,
+        "https://" + "a" * 8192 + "!",
+        "https://hostname:" + "1" * 8192 + "!",
+        "foo://" + "a" * 8192 + ":project:blah.git",
+    ],
+)
+def test_parse_url_should_fail(url):
     with pytest.raises(ValueError):
         ParsedUrl.parse(url)
+
+
+def test_git_config_parses_config_list(mocker):
+    mocker.patch(
+        "subprocess.check_output",
+        return_value=(
+            b"user.name=John Doe\n"
+            b"url.https://example.com/.insteadof=git@example.com:\n"
+            b"core.bare=false\n"
+        ),
+    )
+
+    config = GitConfig()
+
+    assert config.get("user.name") == "John Doe"
+    assert config.get("url.https://example.com/.insteadof") == "git@example.com:"
+    assert config["core.bare"] == "false"
+    assert config.get("core.editor") is None
+
+
+def test_git_config_instance_is_cached(mocker):
+    GitConfig.invalidate()
+    check_output = mocker.patch(
+        "subprocess.check_output", return_value=b"user.name=John Doe\n"
+    )
+
+    try:
+        config = GitConfig.instance()
+
+        assert GitConfig.instance() is config
+        assert Git().config is config
+        assert check_output.call_count == 1
+
+        GitConfig.invalidate()
+
+        assert GitConfig.instance() is not config
+        assert check_output.call_count == 2
+    finally:
+        GitConfig.invalidate()
+
+
+def create_git_repository(path):
+    def git(*args):
+        return subprocess.check_output(
+            [
+                "git",
+                "-c",
+                "user.name=John Doe",
+                "-c",
+                "user.email=john@example.com",
+            ]
+            + list(args),
+            cwd=str(path),
+        )
+
+    git("init", "-q")
+    git("commit", "-q", "--allow-empty", "-m", "first")
+    git("tag", "-a", "-m", "Version 1.0.0", "1.0.0")
+    git("commit", "-q", "--allow-empty", "-m", "second")
+
+    return git
+
+
+def test_rev_parse(tmp_path):
+    git = create_git_repository(tmp_path)
+    head = git("rev-parse", "HEAD").decode().strip()
+    tagged = git("rev-parse", "HEAD~1").decode().strip()
+
+    vcs = Git(tmp_path)
+    try:
+        assert vcs.rev_parse("HEAD") == head
+        assert vcs.rev_parse("1.0.0") == tagged
+        assert vcs.rev_parse(head[:7]) == head
+
+        with pytest.raises(subprocess.CalledProcessError) as e:
+            vcs.rev_parse("unknown")
+
+        assert "unknown revision" in e.value.output
+
+        assert vcs.rev_parse("HEAD") == head
+
+        vcs.checkout("1.0.0")
+
+        assert vcs.rev_parse("HEAD") == tagged
+    finally:
+        vcs.close()
+
+
+def test_rev_parse_in_current_directory(tmp_path, monkeypatch):
+    first = tmp_path / "first"
+    second = tmp_path / "second"
+    first.mkdir()
+    second.mkdir()
+    create_git_repository(first)
+    git = create_git_repository(second)
+    git("commit", "-q", "--allow-empty", "-m", "third")
+
+    vcs = Git()
+    try:
+        monkeypatch.chdir(str(first))
+        first_head = vcs.rev_parse("HEAD")
+
+        monkeypatch.chdir(str(second))
+
+        assert vcs.rev_parse("HEAD") == git("rev-parse", "HEAD").decode().strip()
+        assert vcs.rev_parse("HEAD") != first_head
+    finally:
+        vcs.close()
+
+
+def test_rev_parse_with_relative_folder(tmp_path, monkeypatch):
+    for name in ("first", "second"):
+        (tmp_path / name / "repo").mkdir(parents=True)
+
+    create_git_repository(tmp_path / "first" / "repo")
+    git = create_git_repository(tmp_path / "second" / "repo")
+    git("commit", "-q", "--allow-empty", "-m", "third")
+
+    vcs = Git(Path("repo"))
+    try:
+        monkeypatch.chdir(str(tmp_path / "first"))
+        first_head = vcs.rev_parse("HEAD")
+
+        monkeypatch.chdir(str(tmp_path / "second"))
+
+        assert vcs.rev_parse("HEAD") == git("rev-parse", "HEAD").decode().strip()
+        assert vcs.rev_parse("HEAD") != first_head
+    finally:
+        vcs.close()
+
+
+def test_rev_parse_outside_of_a_repository(tmp_path, mocker):
+    vcs = Git(tmp_path)
+    popen = mocker.spy(subprocess, "Popen")
+
+    for _ in range(2):
+        with pytest.raises(subprocess.CalledProcessError) as e:
+            vcs.rev_parse("HEAD")
+
+        assert "not a git repository" in e.value.output
+
+    batches = [c for c in popen.call_args_list if "cat-file" in c[0][0]]
+    assert len(batches) == 1
+
+
+@pytest.mark.parametrize(
+    "output, url",
+    [
+        (
+            "remote.upstream.url\nhttps://github.com/python-poetry/poetry.git\0"
+            "remote.origin.url\ngit@github.com:sdispater/poetry.git\0",
+            "git@github.com:sdispater/poetry.git",
+        ),
+        (
+            "remote.upstream.url\nhttps://github.com/python-poetry/poetry.git\0"
+            "remote.fork.url\ngit@github.com:sdispater/poetry.git\0",
+            "https://github.com/python-poetry/poetry.git",
+        ),
+        (
+            "remote.origin.url\nfile:///home/John Doe/poetry.git\0",
+            "file:///home/John Doe/poetry.git",
+        ),
+    ],
+)
+def test_remote_url(mocker, output, url):
+    mocker.patch("poetry.core.vcs.git.Git.run", return_value=output)
+
+    assert Git().remote_url() == url
+
+
+def test_remote_url_without_remotes(mocker):
+    mocker.patch("poetry.core.vcs.git.Git.run", return_value="")
+
+    with pytest.raises(IndexError):
+        Git().remote_url()
+
+
+def test_git_config_instance_without_git(mocker):
+    GitConfig.invalidate()
+    check_output = mocker.patch("subprocess.check_output", side_effect=OSError)
+
+    try:
+        config = GitConfig.instance()
+
+        assert config.get("user.name") is None
+        assert check_output.call_count == 1
+
+        with pytest.raises(OSError):
+            GitConfig.instance(requires_git_presence=True)
+
+        assert check_output.call_count == 2
+    finally:
+        GitConfig.invalidate()
+
+
+def _parse_with_pattern(url):
+    m = _pattern().match(url)
+    suffix = m.lastgroup
+
+    return tuple(
+        m.group(group + suffix)
+        for group in ("protocol", "resource", "pathname", "user", "port", "name", "rev")
+    )
+
+
+@pytest.mark.parametrize(
+    "url",
+    [
+        "git+https://github.com/sdispater/pendulum.git",
+        "https://github.com/sdispater/pendulum",
+        "git+ssh://git@github.com/org/repo.git#v1.0.0",
+        "https://user@hostname:8080/project/blah.git",
+        "file:///foo/bar.git",
+        "https://hostname/project/.git",
+        "https://hostname/project/blah.git.git",
+        "https://hostname/project/",
+        "https://hostname/",
+        "https://hostname/project/blah.git@feature/foo",
+        "https://hostname/project/blah#refs/heads/main",
+    ],
+)
+def test_fast_parse_matches_pattern(url):
+    parsed = _fast_parse(url)
+
+    assert parsed is not None
+    assert (
+        parsed.protocol,
+        parsed.resource,
+        parsed.pathname,
+        parsed.user,
+        parsed.port,
+        parsed.name,
+        parsed.rev,
+    ) == _parse_with_pattern(url)
+
+
+@pytest.mark.parametrize(
+    "url",
+    [
+        "git@github.com:org/repo",
+        "git+ssh://git@github.com:sdispater/poetry.git",
+        "git+https://user@hostname:project/blah.git",
+        "git+file://C:\\Users\\hello\\testing.git",
+        "git+file:///home/jörg/projects/café.git",
+        "foo://hostname/project/blah.git",
+        "https://hostname",
+        "https://hostname//project/blah.git",
+        "https://hostname:/project/blah.git",
+        "https://@hostname/project/blah.git",
+        "https://hostname/project/blah.git#",
+        "https://hostname/project/blah.git@v1.0#v2.0",
+    ],
+)
+def test_fast_parse_falls_back_to_pattern(url):
+    assert _fast_parse(url) is None